@@ -1,13 +1,22 @@
 # Import necessary libraries
 import os
+import asyncio  # For warming up the Groq connection in the background
 import streamlit as st  # For building the web app interface
-from langchain_groq import ChatGroq  # Groq's high-performance LLM
-from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper  # Academic research tools
-from langchain_community.tools import ArxivQueryRun, WikipediaQueryRun, DuckDuckGoSearchRun  # Search tools
-from langchain.agents import initialize_agent, AgentType  # LangChain agent setup
-from langchain.callbacks import StreamlitCallbackHandler  # Handles AI thoughts in Streamlit UI
 from dotenv import load_dotenv  # For loading environment variables
-from typing import Optional, Dict, List  # For type hints
+from collections import deque  # Bounded chat history
+from search_core import (  # Search tools, agent and response streaming
+    MAX_SEARCH_RESULTS,
+    MAX_CONTENT_LENGTH,
+    AsyncStreamlitCallbackHandler,
+    create_search_agent,
+    get_event_loop,
+    initialize_llm,
+    initialize_search_tools,
+    prewarm_llm,
+    route_query,
+    stream_agent_response,
+    stream_direct_response
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,41 +24,6 @@ load_dotenv()
 # 🔹 Constants Configuration
 DEFAULT_MODEL = "deepseek-r1-distill-llama-70b"  # Default Groq model
 MAX_CHAT_HISTORY = 20  # Maximum messages to retain in chat history
-MAX_SEARCH_RESULTS = 3  # Default number of results for search tools
-MAX_CONTENT_LENGTH = 500  # Max characters for content snippets
-
-# 🔹 Initialize API Wrappers with Configuration
-def initialize_search_tools(max_results: int = MAX_SEARCH_RESULTS, 
-                          max_content: int = MAX_CONTENT_LENGTH) -> list:
-    """
-    Initialize and configure search tools with proper settings.
-    
-    Args:
-        max_results: Number of results to return per tool
-        max_content: Maximum content length for results
-        
-    Returns:
-        List of configured search tools
-    """
-    # ArXiv API for academic papers
-    arxiv_wrapper = ArxivAPIWrapper(
-        top_k_results=max_results,
-        doc_content_chars_max=max_content,
-        load_max_docs=max_results
-    )
-    
-    # Wikipedia API for general knowledge
-    wiki_wrapper = WikipediaAPIWrapper(
-        top_k_results=max_results,
-        doc_content_chars_max=max_content
-    )
-    
-    # Configured search tools
-    return [
-        DuckDuckGoSearchRun(name="Web Search"),  # General web search
-        ArxivQueryRun(api_wrapper=arxiv_wrapper, name="Academic Papers"),  # Academic research
-        WikipediaQueryRun(api_wrapper=wiki_wrapper, name="Wikipedia")  # Encyclopedia
-    ]
 
 # 🔹 Session State Management
 def initialize_session_state() -> None:
@@ -57,12 +31,24 @@ def initialize_session_state() -> None:
     Initialize or reset the Streamlit session state variables.
     """
     if "messages" not in st.session_state:
-        st.session_state.messages = [
+        st.session_state.messages = deque([
             {"role": "assistant", "content": "Hi! I'm an AI assistant with web search capabilities. How can I help you today?"}
-        ]
+        ], maxlen=MAX_CHAT_HISTORY)
     
     # Get API key only from environment variables
     st.session_state.groq_api_key = os.getenv("GROQ_API_KEY")
+    st.session_state.tavily_api_key = os.getenv("TAVILY_API_KEY")
+
+    # Open the Groq connection in the background once per session
+    if st.session_state.groq_api_key and "llm_prewarmed" not in st.session_state:
+        st.session_state.llm_prewarmed = True
+        llm = initialize_llm(
+            model_name=DEFAULT_MODEL,
+            api_key=st.session_state.groq_api_key,
+            temperature=0.3,
+            streaming=True
+        )
+        asyncio.run_coroutine_threadsafe(prewarm_llm(llm), get_event_loop())
 
 # 🔹 Streamlit UI Configuration
 def setup_ui() -> None:
@@ -94,26 +80,34 @@ def setup_ui() -> None:
             st.markdown("[Get your API key](https://console.groq.com/keys)")
             st.stop()
         
-        # Model selection
-        st.session_state.model_name = st.selectbox(
-            "Model",
-            ["deepseek-r1-distill-llama-70b", "Llama3-70b-8192"],
-            index=0,
-            help="Select the Groq model to use"
-        )
-        
-        # Search configuration
-        st.session_state.max_results = st.slider(
-            "Max Results per Source",
-            1, 5, MAX_SEARCH_RESULTS,
-            help="Number of results to fetch from each source"
-        )
-        
-        if st.button("Clear Chat History"):
-            st.session_state.messages = [
-                {"role": "assistant", "content": "Chat history cleared. How can I help you now?"}
-            ]
-            st.rerun()
+        render_settings()
+
+@st.fragment
+def render_settings() -> None:
+    """
+    Render the sidebar settings as a fragment, so changing a setting reruns
+    only this block instead of the whole app and its chat history.
+    """
+    # Model selection
+    st.session_state.model_name = st.selectbox(
+        "Model",
+        ["deepseek-r1-distill-llama-70b", "Llama3-70b-8192"],
+        index=0,
+        help="Select the Groq model to use"
+    )
+    
+    # Search configuration
+    st.session_state.max_results = st.slider(
+        "Max Results per Source",
+        1, 5, MAX_SEARCH_RESULTS,
+        help="Number of results to fetch from each source"
+    )
+    
+    if st.button("Clear Chat History"):
+        st.session_state.messages = deque([
+            {"role": "assistant", "content": "Chat history cleared. How can I help you now?"}
+        ], maxlen=MAX_CHAT_HISTORY)
+        st.rerun()  # Full app rerun to redraw the cleared history
 
 # 🔹 Chat Display Management
 def display_chat_history() -> None:
@@ -123,32 +117,10 @@ def display_chat_history() -> None:
     for msg in st.session_state.messages:
         with st.chat_message(msg["role"]):
             st.write(msg["content"])
-            if "sources" in msg:
+            if msg.get("sources"):
                 with st.expander("Sources"):
                     st.json(msg["sources"])
 
-# 🔹 Agent Initialization
-def create_search_agent(llm: ChatGroq, tools: list) -> object:
-    """
-    Create and configure a LangChain agent for search tasks.
-    
-    Args:
-        llm: Initialized Groq language model
-        tools: List of search tools to use
-        
-    Returns:
-        Initialized LangChain agent
-    """
-    return initialize_agent(
-        tools=tools,
-        llm=llm,
-        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-        handle_parsing_errors=True,
-        verbose=True,
-        max_iterations=10,
-        early_stopping_method="generate"
-    )
-
 # 🔹 Main Application Logic
 def main() -> None:
     """
@@ -167,68 +139,77 @@ def main() -> None:
         with st.chat_message("user"):
             st.write(prompt)
         
+        # Added up front so sources gathered during the run are kept in the history
+        assistant_message = {"role": "assistant", "content": "", "sources": []}
+        st.session_state.messages.append(assistant_message)
+        
         try:
             # Initialize LLM with Groq
-            llm = ChatGroq(
-                groq_api_key=st.session_state.groq_api_key,
+            llm = initialize_llm(
                 model_name=st.session_state.model_name,
+                api_key=st.session_state.groq_api_key,
                 temperature=0.3,  # Balance creativity and factuality
                 streaming=True
             )
-            
+
             # Initialize search tools with current settings
             tools = initialize_search_tools(
                 max_results=st.session_state.max_results,
-                max_content=MAX_CONTENT_LENGTH
+                max_content=MAX_CONTENT_LENGTH,
+                tavily_api_key=st.session_state.tavily_api_key
             )
-            
+
             # Create search agent
-            search_agent = create_search_agent(llm, tools)
-            
-            # System message for structured responses
-            system_message = f"""
-            You are an advanced AI research assistant with access to multiple search tools.
-            Follow these guidelines:
-            1. Always use the Thought → Action → Observation pattern
-            2. Provide well-structured, concise responses
-            3. Cite sources when available
-            4. If unsure, say you don't know rather than guessing
-            5. For complex queries, break them down into smaller questions
-            
-            Current configuration:
-            - Model: {st.session_state.model_name}
-            - Max results per source: {st.session_state.max_results}
+            search_agent = create_search_agent(
+                st.session_state.model_name,
+                st.session_state.max_results,
+                bool(st.session_state.tavily_api_key),
+                llm,
+                tools
+            )
             
-            User query: {prompt}
-            """
+            # Simple lookups skip the agent and go straight to one tool
+            route = route_query(prompt)
             
             # Generate response
             with st.chat_message("assistant"):
-                st_cb = StreamlitCallbackHandler(
-                    st.container(),
-                    expand_new_thoughts=True,
-                    collapse_completed_thoughts=True
-                )
+                thoughts_container = st.container()
+                placeholder = st.empty()
+                sources_placeholder = st.empty()
+                response = None
+                if route:
+                    tool_name, search_query = route
+                    tool = next(tool for tool in tools if tool.name == tool_name)
+                    response = stream_direct_response(
+                        llm, tool, search_query, prompt, placeholder,
+                        assistant_message["sources"], sources_placeholder
+                    )
                 
-                response = search_agent.run(system_message, callbacks=[st_cb])
+                # Not a simple lookup, or the lookup found nothing; let the agent search more widely
+                if response is None:
+                    st_cb = AsyncStreamlitCallbackHandler(
+                        thoughts_container,
+                        expand_new_thoughts=True,
+                        collapse_completed_thoughts=True
+                    )
+                    
+                    # Tools requested in the same step run concurrently on the event loop
+                    response = stream_agent_response(
+                        search_agent, prompt, [st_cb], placeholder,
+                        assistant_message["sources"], sources_placeholder
+                    )
                 
                 # Store and display response
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": response
-                })
-                st.write(response)
-                
-                # Limit chat history size
-                if len(st.session_state.messages) > MAX_CHAT_HISTORY:
-                    st.session_state.messages = st.session_state.messages[-MAX_CHAT_HISTORY:]
+                assistant_message["content"] = response
+                placeholder.write(response)
                 
         except Exception as e:
             st.error(f"⚠️ An error occurred: {str(e)}")
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": f"Sorry, I encountered an error processing your request. Please try again."
-            })
+            assistant_message["content"] = "Sorry, I encountered an error processing your request. Please try again."
+        finally:
+            # Reruns and stops bypass the handler above; don't leave an empty bubble in the history
+            if not assistant_message["content"]:
+                assistant_message["content"] = "_Response interrupted._"
 
 # Run the application
 if __name__ == "__main__":
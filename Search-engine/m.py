@@ -1,68 +1,73 @@
 # Import necessary libraries
 import os
+import asyncio
 import streamlit as st
-from langchain_groq import ChatGroq
-from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper
-from langchain_community.tools import ArxivQueryRun, WikipediaQueryRun, DuckDuckGoSearchRun
-from langchain.agents import initialize_agent, AgentType
-from langchain.callbacks import StreamlitCallbackHandler
 from dotenv import load_dotenv
-from typing import Optional, Dict, List
+from typing import Optional, Dict
+from collections import deque
+from search_core import (
+    MAX_SEARCH_RESULTS,
+    MAX_CONTENT_LENGTH,
+    AsyncStreamlitCallbackHandler,
+    create_search_agent,
+    get_event_loop,
+    initialize_llm,
+    initialize_search_tools,
+    prewarm_llm,
+    route_query,
+    stream_agent_response,
+    stream_direct_response
+)
 
 # Load environment variables from .env file and Streamlit secrets
 load_dotenv()
 
 # 🔐 Security Check - Verify all required API keys
+REQUIRED_API_KEYS = ('GROQ_API_KEY', 'OPENAI_API_KEY', 'LANGCHAIN_API_KEY', 'HF_TOKEN')
+OPTIONAL_API_KEYS = ('TAVILY_API_KEY',)  # Web search falls back to DuckDuckGo without it
+
+# The script re-executes on every rerun, so module-level values would be rebuilt each time
+@st.cache_resource(show_spinner=False)
+def load_api_keys() -> Dict[str, Optional[str]]:
+    return {name: os.getenv(name) for name in REQUIRED_API_KEYS}
+
 def verify_api_keys():
-    required_keys = {
-        'GROQ_API_KEY': os.getenv("GROQ_API_KEY"),
-        'OPENAI_API_KEY': os.getenv("OPENAI_API_KEY"),
-        'LANGCHAIN_API_KEY': os.getenv("LANGCHAIN_API_KEY"),
-        'HF_TOKEN': os.getenv("HF_TOKEN")
-    }
+    required_keys = load_api_keys()
     
     missing_keys = [name for name, value in required_keys.items() if not value]
     if missing_keys:
+        load_api_keys.clear()  # Re-read the environment once the keys have been added
         st.error(f"❌ Missing API keys: {', '.join(missing_keys)}")
         st.markdown("Please add them to your `.streamlit/secrets.toml` file")
         st.stop()
-    return required_keys
+    # Optional keys are read on every rerun, so adding one later takes effect without a restart
+    return {**required_keys, **{name: os.getenv(name) for name in OPTIONAL_API_KEYS}}
 
 # 🔹 Constants Configuration
 DEFAULT_MODEL = "deepseek-r1-distill-llama-70b"
 MAX_CHAT_HISTORY = 20
-MAX_SEARCH_RESULTS = 3
-MAX_CONTENT_LENGTH = 500
-
-# 🔹 Initialize API Wrappers with Configuration
-def initialize_search_tools(max_results: int = MAX_SEARCH_RESULTS, 
-                          max_content: int = MAX_CONTENT_LENGTH) -> list:
-    arxiv_wrapper = ArxivAPIWrapper(
-        top_k_results=max_results,
-        doc_content_chars_max=max_content,
-        load_max_docs=max_results
-    )
-    
-    wiki_wrapper = WikipediaAPIWrapper(
-        top_k_results=max_results,
-        doc_content_chars_max=max_content
-    )
-    
-    return [
-        DuckDuckGoSearchRun(name="Web Search"),
-        ArxivQueryRun(api_wrapper=arxiv_wrapper, name="Academic Papers"),
-        WikipediaQueryRun(api_wrapper=wiki_wrapper, name="Wikipedia")
-    ]
+SYSTEM_GUIDELINES = "You are an advanced AI research assistant with access to multiple search tools."
 
 # 🔹 Session State Management
 def initialize_session_state():
     if "messages" not in st.session_state:
-        st.session_state.messages = [
+        st.session_state.messages = deque([
             {"role": "assistant", "content": "Hi! I'm an AI assistant with web search capabilities. How can I help you today?"}
-        ]
+        ], maxlen=MAX_CHAT_HISTORY)
     
     # Verify API keys are loaded
     st.session_state.api_keys = verify_api_keys()
+    
+    # Open the Groq connection in the background once per session
+    if "llm_prewarmed" not in st.session_state:
+        st.session_state.llm_prewarmed = True
+        llm = initialize_llm(
+            model_name=DEFAULT_MODEL,
+            api_key=st.session_state.api_keys['GROQ_API_KEY'],
+            temperature=0.3,
+            streaming=True
+        )
+        asyncio.run_coroutine_threadsafe(prewarm_llm(llm), get_event_loop())
 
 # 🔹 Streamlit UI Configuration
 def setup_ui():
@@ -84,46 +89,39 @@ def setup_ui():
         # Display API key status
         st.success("✅ All API keys configured")
         
-        # Model selection
-        st.session_state.model_name = st.selectbox(
-            "Model",
-            ["deepseek-r1-distill-llama-70b", "Llama3-70b-8192"],
-            index=0
-        )
-        
-        # Search configuration
-        st.session_state.max_results = st.slider(
-            "Max Results per Source",
-            1, 5, MAX_SEARCH_RESULTS
-        )
-        
-        if st.button("Clear Chat History"):
-            st.session_state.messages = [
-                {"role": "assistant", "content": "Chat history cleared. How can I help you now?"}
-            ]
-            st.rerun()
+        render_settings()
+
+# Reruns on its own when a setting changes, leaving the chat history untouched
+@st.fragment
+def render_settings():
+    # Model selection
+    st.session_state.model_name = st.selectbox(
+        "Model",
+        ["deepseek-r1-distill-llama-70b", "Llama3-70b-8192"],
+        index=0
+    )
+    
+    # Search configuration
+    st.session_state.max_results = st.slider(
+        "Max Results per Source",
+        1, 5, MAX_SEARCH_RESULTS
+    )
+    
+    if st.button("Clear Chat History"):
+        st.session_state.messages = deque([
+            {"role": "assistant", "content": "Chat history cleared. How can I help you now?"}
+        ], maxlen=MAX_CHAT_HISTORY)
+        st.rerun()
 
 # 🔹 Chat Display Management
 def display_chat_history():
     for msg in st.session_state.messages:
         with st.chat_message(msg["role"]):
             st.write(msg["content"])
-            if "sources" in msg:
+            if msg.get("sources"):
                 with st.expander("Sources"):
                     st.json(msg["sources"])
 
-# 🔹 Agent Initialization
-def create_search_agent(llm: ChatGroq, tools: list) -> object:
-    return initialize_agent(
-        tools=tools,
-        llm=llm,
-        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-        handle_parsing_errors=True,
-        verbose=True,
-        max_iterations=10,
-        early_stopping_method="generate"
-    )
-
 # 🔹 Main Application Logic
 def main():
     initialize_session_state()
@@ -135,11 +133,14 @@ def main():
         with st.chat_message("user"):
             st.write(prompt)
         
+        assistant_message = {"role": "assistant", "content": "", "sources": []}
+        st.session_state.messages.append(assistant_message)
+        
         try:
             # Initialize LLM with Groq
-            llm = ChatGroq(
-                groq_api_key=st.session_state.api_keys['GROQ_API_KEY'],
+            llm = initialize_llm(
                 model_name=st.session_state.model_name,
+                api_key=st.session_state.api_keys['GROQ_API_KEY'],
                 temperature=0.3,
                 streaming=True
             )
@@ -147,45 +148,63 @@ def main():
             # Initialize search tools
             tools = initialize_search_tools(
                 max_results=st.session_state.max_results,
-                max_content=MAX_CONTENT_LENGTH
+                max_content=MAX_CONTENT_LENGTH,
+                tavily_api_key=st.session_state.api_keys['TAVILY_API_KEY']
             )
             
             # Create search agent
-            search_agent = create_search_agent(llm, tools)
+            search_agent = create_search_agent(
+                st.session_state.model_name,
+                st.session_state.max_results,
+                bool(st.session_state.api_keys['TAVILY_API_KEY']),
+                llm,
+                tools,
+                system_prompt=SYSTEM_GUIDELINES
+            )
             
-            # System message for structured responses
-            system_message = f"""
-            You are an advanced AI research assistant with access to multiple search tools.
-            Current configuration:
-            - Model: {st.session_state.model_name}
-            - Max results per source: {st.session_state.max_results}
-            """
+            route = route_query(prompt)
             
             # Generate response
             with st.chat_message("assistant"):
-                st_cb = StreamlitCallbackHandler(
-                    st.container(),
-                    expand_new_thoughts=True,
-                    collapse_completed_thoughts=True
-                )
-                
-                response = search_agent.run(system_message + "\n\nUser query: " + prompt, callbacks=[st_cb])
+                thoughts_container = st.container()
+                placeholder = st.empty()
+                sources_placeholder = st.empty()
+                response = None
+                if route:
+                    tool_name, search_query = route
+                    tool = next(tool for tool in tools if tool.name == tool_name)
+                    response = stream_direct_response(
+                        llm, tool, search_query, prompt, placeholder,
+                        assistant_message["sources"], sources_placeholder,
+                        system_prompt=SYSTEM_GUIDELINES
+                    )
                 
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": response
-                })
-                st.write(response)
+                # Fall back to the agent when the lookup found nothing
+                if response is None:
+                    st_cb = AsyncStreamlitCallbackHandler(
+                        thoughts_container,
+                        expand_new_thoughts=True,
+                        collapse_completed_thoughts=True
+                    )
+                    
+                    response = stream_agent_response(
+                        search_agent,
+                        prompt,
+                        [st_cb],
+                        placeholder,
+                        assistant_message["sources"],
+                        sources_placeholder
+                    )
                 
-                if len(st.session_state.messages) > MAX_CHAT_HISTORY:
-                    st.session_state.messages = st.session_state.messages[-MAX_CHAT_HISTORY:]
+                assistant_message["content"] = response
+                placeholder.write(response)
                 
         except Exception as e:
             st.error(f"⚠️ An error occurred: {str(e)}")
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": "Sorry, I encountered an error processing your request. Please try again."
-            })
+            assistant_message["content"] = "Sorry, I encountered an error processing your request. Please try again."
+        finally:
+            if not assistant_message["content"]:
+                assistant_message["content"] = "_Response interrupted._"
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,701 @@
+"""
+Search tools, agent and response streaming shared by the Streamlit apps
+(app.py and m.py). The apps keep only their session state, UI and main loop.
+"""
+import re  # For routing lookup subjects
+import hashlib  # For disk cache keys
+import asyncio  # For running the agent and its tools concurrently
+import functools
+import threading
+import time
+import random  # For retry backoff jitter
+import aiohttp  # Pooled async HTTP for web search
+import httpx  # HTTP client used by the Groq SDK
+import streamlit as st  # Resource caching and response rendering
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx  # Lets the event loop thread update the UI
+from langchain_groq import ChatGroq  # Groq's high-performance LLM
+from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper  # Academic research tools
+from langchain_community.tools import ArxivQueryRun, WikipediaQueryRun, DuckDuckGoSearchRun  # Search tools
+from langchain.agents import AgentExecutor, create_tool_calling_agent  # LangChain agent setup
+from langchain.agents.agent import RunnableMultiActionAgent  # Agent wrapper used by AgentExecutor
+from langchain_core.agents import AgentFinish  # Final answer of a stopped agent run
+from langchain_core.prompts import ChatPromptTemplate  # Agent prompt
+from langchain_community.callbacks.streamlit.streamlit_callback_handler import StreamlitCallbackHandler  # Handles AI thoughts in Streamlit UI
+from typing import Optional, Dict, List, Callable, Tuple  # For type hints
+from diskcache import Cache  # On-disk cache for search responses
+from collections import OrderedDict  # LRU cache for repeated queries
+from langchain_core.tools import BaseTool, ToolException  # Base class for custom tools
+from pydantic import PrivateAttr
+
+# 🔹 Constants Configuration
+MAX_SEARCH_RESULTS = 3  # Default number of results for search tools
+MAX_CONTENT_LENGTH = 500  # Max characters for content snippets
+BATCH_WINDOW_SECONDS = 0.05  # How long tool queries are collected before dispatch
+MAX_BATCH_SIZE = 8  # Max queries dispatched concurrently per tool
+QUERY_CACHE_SIZE = 256  # Recent tool results kept per tool
+QUERY_CACHE_TTL = 5 * 60  # Seconds a recent tool result is reused across sessions
+RESPONSE_CACHE_DIR = ".cache"  # Directory for cached ArXiv and Wikipedia responses
+ARXIV_CACHE_TTL = 24 * 60 * 60  # Seconds to keep cached ArXiv results
+WIKIPEDIA_CACHE_TTL = 7 * 24 * 60 * 60  # Seconds to keep cached Wikipedia results
+SEARCH_ERROR_PREFIXES = ("Arxiv exception",)  # Results that are never cached
+GROQ_KEEPALIVE_SECONDS = 60  # How long idle Groq connections stay open for reuse
+THOUGHT_FLUSH_INTERVAL = 0.2  # Seconds between UI updates of streamed agent thoughts
+SCRATCHPAD_TOKEN_BUDGET = 3000  # Agent stops once its tool calls and results exceed this
+CHARS_PER_TOKEN = 4  # Rough estimate used for the scratchpad budget
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"  # Keyed web search API
+SEARCH_CONNECTION_LIMIT = 20  # Max open connections in the shared HTTP session
+SEARCH_KEEPALIVE_SECONDS = 60  # How long idle search connections stay open for reuse
+SEARCH_TIMEOUT_SECONDS = 15  # Total timeout per web search request
+SEARCH_MAX_ATTEMPTS = 3  # Attempts per web search before giving up
+SEARCH_RETRY_DELAY = 0.5  # Base delay in seconds between attempts, doubled each retry
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)  # HTTP statuses worth retrying
+SOURCE_SNIPPET_LENGTH = 200  # Characters of each tool result shown under Sources
+
+# Default system prompt for the search agent, sent once per LLM call instead of per user turn
+SYSTEM_GUIDELINES = """You are an advanced AI research assistant with access to multiple search tools.
+Follow these guidelines:
+1. Use the search tools to gather information before answering
+2. Provide well-structured, concise responses
+3. Cite sources when available
+4. If unsure, say you don't know rather than guessing
+5. For complex queries, break them down into smaller questions"""
+
+# Question prefixes answered with one direct lookup instead of the agent loop
+DIRECT_ROUTES = {
+    "wikipedia": ("what is ", "what are ", "who is ", "who was ", "define "),
+    "academic_papers": ("papers on ", "papers about ", "research papers on ")
+}
+DIRECT_ROUTE_MAX_WORDS = 5  # Longer subjects usually need the full agent
+DIRECT_ROUTE_TERM = re.compile(r"[a-z][a-z0-9' .-]*")  # Subjects that look like a name or term
+# Time-sensitive words that send a lookup to the agent instead
+CURRENT_EVENT_WORDS = {
+    "today", "tonight", "yesterday", "tomorrow", "now", "current", "currently",
+    "latest", "recent", "news", "price", "prices", "weather", "score", "live"
+}
+# Lookup results meaning nothing was found, so the agent searches more widely instead
+EMPTY_RESULT_PREFIXES = ("No good ",) + SEARCH_ERROR_PREFIXES
+DIRECT_ANSWER_PROMPT = """Answer the question using the {source} results below.
+
+{source} results:
+{context}
+
+Question: {question}"""
+
+# 🔹 Response Caching
+@st.cache_resource(show_spinner=False)
+def get_response_cache() -> Cache:
+    """
+    Open the on-disk cache shared by the ArXiv and Wikipedia wrappers.
+
+    Returns:
+        Disk cache stored in RESPONSE_CACHE_DIR
+    """
+    return Cache(RESPONSE_CACHE_DIR)
+
+def cached_search(cache: Cache, source: str, query: str, settings: tuple,
+                  ttl: int, search: Callable[[str], str]) -> str:
+    """
+    Return a cached search result, or run the search and cache its result.
+
+    Args:
+        cache: Disk cache to read from and write to
+        source: Name of the search source, part of the cache key
+        query: Search query
+        settings: Wrapper settings that affect the result, part of the cache key
+        ttl: Seconds before a cached result expires
+        search: Function performing the actual search
+
+    Returns:
+        Search result text
+    """
+    key = hashlib.sha256(f"{source}\n{query}\n{settings}".encode()).hexdigest()
+    result = cache.get(key)
+    if result is None:
+        result = search(query)
+        # Don't keep failed lookups around for the whole TTL
+        if not result.startswith(SEARCH_ERROR_PREFIXES):
+            cache.set(key, result, expire=ttl)
+    return result
+
+class CachedArxivAPIWrapper(ArxivAPIWrapper):
+    """
+    ArXiv wrapper that serves repeated queries from the disk cache.
+    """
+    _cache: Cache = PrivateAttr(default_factory=get_response_cache)
+
+    def run(self, query: str) -> str:
+        settings = (self.top_k_results, self.doc_content_chars_max)
+        return cached_search(self._cache, "arxiv", query, settings, ARXIV_CACHE_TTL, super().run)
+
+class CachedWikipediaAPIWrapper(WikipediaAPIWrapper):
+    """
+    Wikipedia wrapper that serves repeated queries from the disk cache.
+    """
+    _cache: Cache = PrivateAttr(default_factory=get_response_cache)
+
+    def run(self, query: str) -> str:
+        settings = (self.top_k_results, self.doc_content_chars_max, self.lang)
+        return cached_search(self._cache, "wikipedia", query, settings, WIKIPEDIA_CACHE_TTL, super().run)
+
+# 🔹 Custom Search Tools
+@st.cache_resource(show_spinner=False)
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Create a keep-alive aiohttp session on the shared event loop, reused by
+    every search request so connections and TLS sessions are not re-established.
+
+    Returns:
+        Shared aiohttp client session
+    """
+    async def create_session() -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=SEARCH_CONNECTION_LIMIT,
+                keepalive_timeout=SEARCH_KEEPALIVE_SECONDS
+            ),
+            timeout=aiohttp.ClientTimeout(total=SEARCH_TIMEOUT_SECONDS)
+        )
+    return run_async(create_session())
+
+class TavilySearchTool(BaseTool):
+    """
+    Web search through the Tavily API over the shared aiohttp session.
+    Rate-limited, server and connection errors are retried with jittered
+    exponential backoff. A search that still fails is reported to the agent
+    as the tool result instead of aborting the run.
+    """
+    name: str = "web_search"
+    description: str = "Search the web for current information. Input should be a search query."
+    handle_tool_error: bool = True
+    api_key: str
+    max_results: int = MAX_SEARCH_RESULTS
+    max_content: int = MAX_CONTENT_LENGTH
+    _session: aiohttp.ClientSession = PrivateAttr(default_factory=get_http_session)
+
+    def _run(self, query: str) -> str:
+        return run_async(self._arun(query))
+
+    async def _arun(self, query: str) -> str:
+        payload = {"query": query, "max_results": self.max_results}
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        for attempt in range(1, SEARCH_MAX_ATTEMPTS + 1):
+            try:
+                async with self._session.post(TAVILY_SEARCH_URL, json=payload, headers=headers) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+                break
+            except aiohttp.ClientResponseError as error:
+                if error.status not in RETRYABLE_STATUSES or attempt == SEARCH_MAX_ATTEMPTS:
+                    raise ToolException(f"Web search failed: {error.status} {error.message}") from error
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if attempt == SEARCH_MAX_ATTEMPTS:
+                    raise ToolException(f"Web search failed: {str(error) or type(error).__name__}") from error
+            await asyncio.sleep(SEARCH_RETRY_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+        results = [
+            f"{result['title']} ({result['url']})\n{result['content'][:self.max_content]}"
+            for result in data.get("results", [])
+        ]
+        return "\n\n".join(results) or "No good search result was found"
+
+# 🔹 Initialize API Wrappers with Configuration
+@st.cache_resource(show_spinner=False)
+def initialize_search_tools(max_results: int = MAX_SEARCH_RESULTS,
+                          max_content: int = MAX_CONTENT_LENGTH,
+                          tavily_api_key: Optional[str] = None) -> list:
+    """
+    Initialize and configure search tools with proper settings.
+    Cached across Streamlit reruns, so tools are only rebuilt when settings change.
+
+    Args:
+        max_results: Number of results to return per tool
+        max_content: Maximum content length for results
+        tavily_api_key: Tavily API key; DuckDuckGo is used when it is not set
+        
+    Returns:
+        List of configured search tools
+    """
+    # ArXiv API for academic papers
+    arxiv_wrapper = CachedArxivAPIWrapper(
+        top_k_results=max_results,
+        doc_content_chars_max=max_content,
+        load_max_docs=max_results
+    )
+    
+    # Wikipedia API for general knowledge
+    wiki_wrapper = CachedWikipediaAPIWrapper(
+        top_k_results=max_results,
+        doc_content_chars_max=max_content
+    )
+    
+    # General web search, keyed API when available
+    if tavily_api_key:
+        web_search = TavilySearchTool(api_key=tavily_api_key, max_results=max_results, max_content=max_content)
+    else:
+        web_search = DuckDuckGoSearchRun(name="web_search")
+    
+    # Configured search tools
+    tools = [
+        web_search,  # General web search
+        ArxivQueryRun(api_wrapper=arxiv_wrapper, name="academic_papers"),  # Academic research
+        WikipediaQueryRun(api_wrapper=wiki_wrapper, name="wikipedia")  # Encyclopedia
+    ]
+
+    # Batch and deduplicate repeated lookups; web results are never reused across queries
+    return [BatchedSearchTool(tool, cache_ttl=0 if tool is web_search else QUERY_CACHE_TTL) for tool in tools]
+
+# 🔹 Async Execution
+@st.cache_resource(show_spinner=False)
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Start a single event loop on a background thread, shared by all sessions.
+    Cached async clients (e.g. the Groq HTTP pool) stay bound to this loop
+    instead of a new loop being created for every query.
+
+    Returns:
+        Running asyncio event loop
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="search-agent-loop", daemon=True).start()
+    return loop
+
+def run_async(coro):
+    """
+    Run a coroutine on the shared event loop and wait for its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+_END_OF_STREAM = object()
+
+async def _anext(agen):
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return _END_OF_STREAM
+
+def iterate_async(agen):
+    """
+    Consume an async generator running on the shared event loop from the
+    script thread, so each item can be rendered as soon as it arrives.
+    """
+    try:
+        while (item := run_async(_anext(agen))) is not _END_OF_STREAM:
+            yield item
+    finally:
+        run_async(agen.aclose())
+
+class AsyncStreamlitCallbackHandler(StreamlitCallbackHandler):
+    """
+    Streamlit callback handler that can be driven from the shared event loop.
+    LangChain runs its events in executor threads, off the loop, so the
+    script context of the session is attached before every event and
+    events are serialized with a lock.
+    Streamed tokens are batched so the thought container is redrawn a few
+    times per second rather than once per token.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._script_ctx = get_script_run_ctx()
+        self._lock = threading.RLock()
+        self._pending_tokens: List[str] = []
+        self._last_flush = 0.0
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        # Redraw the thought at most every THOUGHT_FLUSH_INTERVAL instead of per token
+        self._pending_tokens.append(token)
+        if time.monotonic() - self._last_flush >= THOUGHT_FLUSH_INTERVAL:
+            self._flush_tokens(**kwargs)
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self._flush_tokens()
+        super().on_llm_end(response, **kwargs)
+
+    def on_llm_error(self, error: BaseException, **kwargs) -> None:
+        self._flush_tokens()
+        super().on_llm_error(error, **kwargs)
+
+    def _flush_tokens(self, **kwargs) -> None:
+        if self._pending_tokens:
+            super().on_llm_new_token("".join(self._pending_tokens), **kwargs)
+            self._pending_tokens.clear()
+        self._last_flush = time.monotonic()
+
+def _with_script_ctx(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            add_script_run_ctx(threading.current_thread(), self._script_ctx)
+            return method(self, *args, **kwargs)
+    return wrapper
+
+for _name in dir(AsyncStreamlitCallbackHandler):
+    if _name.startswith("on_"):
+        setattr(AsyncStreamlitCallbackHandler, _name,
+                _with_script_ctx(getattr(AsyncStreamlitCallbackHandler, _name)))
+
+# 🔹 Query Batching
+class QueryBatcher:
+    """
+    Coalesce queries sent to one search tool within a short window.
+    Queued queries are dispatched together (duplicates only once), and
+    results are kept in a short-lived LRU cache keyed on the normalized
+    query. A cache_ttl of 0 disables the cache.
+    """
+
+    def __init__(self, tool: BaseTool, window: float = BATCH_WINDOW_SECONDS,
+                 max_batch: int = MAX_BATCH_SIZE, cache_size: int = QUERY_CACHE_SIZE,
+                 cache_ttl: float = QUERY_CACHE_TTL):
+        self._tool = tool
+        self._window = window
+        self._max_batch = max_batch
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, query: str) -> str:
+        """
+        Queue a query for the next batch, or answer it from the cache.
+        """
+        key = " ".join(query.lower().split())
+        entry = self._cache.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[0] < self._cache_ttl:
+                self._cache.move_to_end(key)
+                return entry[1]
+            del self._cache[key]
+
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._drain())
+        future = loop.create_future()
+        self._queue.put_nowait((key, query, future))
+        return await future
+
+    async def _drain(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self._window)
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Group waiters by normalized query so duplicates share one request
+            pending: Dict[str, tuple] = {}
+            for key, query, future in batch:
+                pending.setdefault(key, (query, []))[1].append(future)
+
+            # Run detached from the callbacks of whichever agent run started the worker
+            results = await asyncio.gather(
+                *(self._tool.ainvoke(query, config={"callbacks": []}) for query, _ in pending.values()),
+                return_exceptions=True
+            )
+            for (key, (_, futures)), result in zip(pending.items(), results):
+                if not isinstance(result, BaseException):
+                    self._remember(key, result)
+                for future in futures:
+                    if future.done():
+                        continue
+                    if isinstance(result, BaseException):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    def _remember(self, key: str, result: str) -> None:
+        if self._cache_ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic(), result)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+class BatchedSearchTool(BaseTool):
+    """
+    Search tool that routes its queries through a QueryBatcher.
+    """
+    tool: BaseTool
+    _batcher: QueryBatcher = PrivateAttr()
+
+    def __init__(self, tool: BaseTool, cache_ttl: float = QUERY_CACHE_TTL, **kwargs):
+        super().__init__(tool=tool, name=tool.name, description=tool.description, **kwargs)
+        self._batcher = QueryBatcher(tool, cache_ttl=cache_ttl)
+
+    def _run(self, query: str) -> str:
+        return run_async(self._batcher.submit(query))
+
+    async def _arun(self, query: str) -> str:
+        return await self._batcher.submit(query)
+
+# 🔹 LLM Initialization
+@st.cache_resource(show_spinner=False)
+def initialize_llm(model_name: str, api_key: str,
+                   temperature: float = 0.3, streaming: bool = True) -> ChatGroq:
+    """
+    Create a Groq language model, reused across Streamlit reruns.
+
+    Args:
+        model_name: Groq model identifier
+        api_key: Groq API key
+        temperature: Sampling temperature
+        streaming: Whether to stream tokens from the model
+
+    Returns:
+        Initialized Groq language model
+    """
+    return ChatGroq(
+        groq_api_key=api_key,
+        model_name=model_name,
+        temperature=temperature,
+        streaming=streaming,
+        # Keep idle connections around so reruns and warmups can reuse them
+        http_async_client=httpx.AsyncClient(
+            limits=httpx.Limits(keepalive_expiry=GROQ_KEEPALIVE_SECONDS)
+        )
+    )
+
+async def prewarm_llm(llm: ChatGroq) -> None:
+    """
+    Send a one-token request so the TLS connection to Groq is already
+    open when the user submits their first query.
+
+    Args:
+        llm: Groq language model whose connection pool should be warmed
+    """
+    try:
+        await llm.bind(max_tokens=1).ainvoke("ping")
+    except Exception:
+        pass  # Best effort; the real query reports any connection errors
+
+# 🔹 Agent Initialization
+def stopped_response(reason: str, intermediate_steps: list) -> AgentFinish:
+    """
+    Build the final answer of an agent run that was stopped early, listing a
+    short snippet of each result gathered so far.
+
+    Args:
+        reason: Why the run was stopped
+        intermediate_steps: Tool calls made so far with their results
+
+    Returns:
+        Agent finish carrying the answer
+    """
+    observations = []
+    seen = set()
+    for action, observation in intermediate_steps:
+        call = (action.tool, str(action.tool_input))
+        if call in seen:
+            continue
+        seen.add(call)
+        query = action.tool_input
+        if isinstance(query, dict):
+            query = query.get("query", query)
+        observations.append(f"- **{action.tool}** ({query}): {str(observation)[:SOURCE_SNIPPET_LENGTH]}")
+    output = f"Stopped early because {reason}. Results so far:\n\n" + "\n".join(observations)
+    return AgentFinish(return_values={"output": output}, log=output)
+
+class StoppableAgent(RunnableMultiActionAgent):
+    """
+    Tool-calling agent that answers a run ending at the iteration limit the
+    same way as the executor's other early stops, instead of LangChain's
+    fixed "Agent stopped due to max iterations." message.
+    """
+
+    def return_stopped_response(self, early_stopping_method: str,
+                                intermediate_steps: list, **kwargs) -> AgentFinish:
+        return stopped_response("it reached the step limit", intermediate_steps)
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """
+    Agent executor that also stops early once the scratchpad outgrows its
+    token budget or the agent repeats a tool call it has already made.
+    """
+    scratchpad_token_budget: int = SCRATCHPAD_TOKEN_BUDGET
+
+    def _stop_reason(self, intermediate_steps: list) -> Optional[str]:
+        scratchpad_chars = sum(
+            len(str(action.tool_input)) + len(str(observation))
+            for action, observation in intermediate_steps
+        )
+        if scratchpad_chars // CHARS_PER_TOKEN > self.scratchpad_token_budget:
+            return "the search results exceeded the token budget"
+        calls = [(action.tool, str(action.tool_input)) for action, _ in intermediate_steps]
+        if len(calls) != len(set(calls)):
+            return "the same search was repeated"
+        return None
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs,
+                        intermediate_steps, run_manager=None):
+        reason = self._stop_reason(intermediate_steps)
+        if reason:
+            yield stopped_response(reason, intermediate_steps)
+            return
+        yield from super()._iter_next_step(
+            name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+        )
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs,
+                               intermediate_steps, run_manager=None):
+        reason = self._stop_reason(intermediate_steps)
+        if reason:
+            yield stopped_response(reason, intermediate_steps)
+            return
+        async for step in super()._aiter_next_step(
+            name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+        ):
+            yield step
+
+@st.cache_resource(show_spinner=False)
+def create_search_agent(model_name: str, max_results: int, use_tavily: bool,
+                        _llm: ChatGroq, _tools: list,
+                        system_prompt: str = SYSTEM_GUIDELINES) -> object:
+    """
+    Create and configure a LangChain agent for search tasks.
+    Cached per model, result count and web search backend; the underscored
+    arguments are not hashed.
+
+    Args:
+        model_name: Groq model identifier the LLM was built with
+        max_results: Number of results the tools were built with
+        use_tavily: Whether the tools were built with Tavily web search
+        _llm: Initialized Groq language model
+        _tools: List of search tools to use
+        system_prompt: System prompt for the agent
+
+    Returns:
+        Initialized LangChain agent
+    """
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}")
+    ])
+    agent = StoppableAgent(runnable=create_tool_calling_agent(_llm, _tools, prompt))
+    return BudgetedAgentExecutor(
+        agent=agent,
+        tools=_tools,
+        verbose=True,
+        max_iterations=4,
+        early_stopping_method="force"
+    )
+
+# 🔹 Query Routing
+def route_query(prompt: str) -> Optional[Tuple[str, str]]:
+    """
+    Pick a single search tool for simple lookup questions about a name or
+    term. Time-sensitive questions and anything else go to the agent.
+
+    Args:
+        prompt: User query
+
+    Returns:
+        Tuple of (tool name, search query), or None if the agent should handle it
+    """
+    text = " ".join(prompt.lower().split())
+    for tool_name, prefixes in DIRECT_ROUTES.items():
+        for prefix in prefixes:
+            if text.startswith(prefix):
+                subject = text[len(prefix):].strip(" ?.!")
+                if (len(subject.split()) <= DIRECT_ROUTE_MAX_WORDS
+                        and DIRECT_ROUTE_TERM.fullmatch(subject)
+                        and CURRENT_EVENT_WORDS.isdisjoint(re.findall(r"[a-z]+", subject))):
+                    return tool_name, subject
+                return None
+    return None
+
+# 🔹 Response Streaming
+def add_source(sources: list, placeholder, tool_name: str, query: str, output) -> None:
+    """
+    Record a tool result as a source and redraw the sources expander.
+
+    Args:
+        sources: Sources of the current assistant message
+        placeholder: Streamlit element the sources are rendered into
+        tool_name: Name of the tool that produced the result
+        query: Query sent to the tool
+        output: Tool result
+    """
+    sources.append({
+        "tool": tool_name,
+        "query": query,
+        "snippet": str(output)[:SOURCE_SNIPPET_LENGTH]
+    })
+    with placeholder.container():
+        with st.expander("Sources"):
+            st.json(sources)
+
+def stream_direct_response(llm: ChatGroq, tool: BaseTool, search_query: str, prompt: str,
+                           placeholder, sources: list, sources_placeholder,
+                           system_prompt: str = SYSTEM_GUIDELINES) -> Optional[str]:
+    """
+    Answer from a single tool lookup with one LLM call, skipping the agent loop.
+    The lookup is still recorded as a source when it finds nothing.
+
+    Args:
+        llm: Initialized Groq language model
+        tool: Search tool to query
+        search_query: Query sent to the tool
+        prompt: Original user query
+        placeholder: Streamlit element the answer is rendered into
+        sources: Sources of the current assistant message
+        sources_placeholder: Streamlit element the sources are rendered into
+        system_prompt: System prompt for the answering LLM call
+
+    Returns:
+        Complete response, or None if the lookup found nothing
+    """
+    with st.spinner(f"Searching {tool.name}..."):
+        context = run_async(tool.ainvoke(search_query))
+    add_source(sources, sources_placeholder, tool.name, search_query, context)
+    if not context.strip() or context.startswith(EMPTY_RESULT_PREFIXES):
+        return None
+    messages = [
+        ("system", system_prompt),
+        ("human", DIRECT_ANSWER_PROMPT.format(source=tool.name, context=context, question=prompt))
+    ]
+    response = ""
+    for chunk in iterate_async(llm.astream(messages)):
+        response += chunk.content
+        placeholder.markdown(response)
+    return response
+
+def stream_agent_response(search_agent, agent_input: str, callbacks: list, placeholder,
+                          sources: list, sources_placeholder) -> str:
+    """
+    Run the agent and stream its final answer into the placeholder as it is generated.
+    Each tool result is added to the sources as soon as the tool finishes.
+
+    Args:
+        search_agent: Initialized LangChain agent
+        agent_input: Input text for the agent
+        callbacks: Callback handlers for the agent run
+        placeholder: Streamlit element the answer is rendered into
+        sources: Sources of the current assistant message
+        sources_placeholder: Streamlit element the sources are rendered into
+
+    Returns:
+        Complete agent response
+    """
+    llm_outputs: Dict[str, str] = {}
+    response = ""
+    events = search_agent.astream_events(
+        {"input": agent_input},
+        {"callbacks": callbacks},
+        version="v2"
+    )
+    for event in iterate_async(events):
+        if event["event"] == "on_chat_model_stream":
+            # Tool-calling steps carry no text, so content comes from the answering step
+            content = event["data"]["chunk"].content
+            if content:
+                run_id = event["run_id"]
+                llm_outputs[run_id] = llm_outputs.get(run_id, "") + content
+                placeholder.markdown(llm_outputs[run_id])
+        elif event["event"] == "on_tool_end":
+            tool_input = event["data"].get("input", {})
+            query = tool_input.get("query", "") if isinstance(tool_input, dict) else str(tool_input)
+            add_source(sources, sources_placeholder, event["name"], query, event["data"].get("output", ""))
+        elif event["event"] == "on_chain_end" and not event["parent_ids"]:
+            response = event["data"]["output"]["output"]
+    return response
\ No newline at end of file